@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+诈骗案例存储压测工具
+
+针对 scrap_165.py 中的 save_cases_to_firebase 与 search_similar_cases，
+在本地 Firestore 模拟器或内存替身上生成合成案例并测量：
+- 写入吞吐量（案例/秒）
+- 查询延迟分位数（p50/p90/p99）
+- 每次操作的往返次数（get/set/update/stream）
+
+用法示例：
+    python benchmark_firestore.py --sizes 10000,100000
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmark_firestore.py --backend emulator
+    python benchmark_firestore.py --sizes 1000000 --output bench_results.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+from rate_limiter import get_limiter
+from scrap_165 import FIRESTORE_HOST, extract_keywords, save_cases_to_firebase, search_similar_cases
+
+# 会产生网络往返的 Firestore 方法
+ROUND_TRIP_METHODS = ('get', 'set', 'update', 'delete', 'stream', 'commit')
+
+LOCATIONS = [
+    '台北市', '新北市', '桃园市', '台中市', '台南市', '高雄市', '基隆市',
+    '新竹市', '嘉义市', '新竹县', '苗栗县', '彰化县', '南投县', '云林县',
+    '嘉义县', '屏东县', '宜兰县', '花莲县', '台东县', '澎湖县'
+]
+
+# 手法名称会写入 summary，因此不得包含 extract_keywords 的任何关键词，
+# 否则会按手法均匀分布地命中关键词，抹平下方的 Zipf 分布
+METHODS = [
+    '假理财', '假购物', '假恋爱', '假冒电商人员', '假冒警察', '假抽奖',
+    '假借款', '假求职', '猜猜我是谁', '骇客入侵'
+]
+
+# 与 extract_keywords 中的关键词一致，按常见程度排序（越靠前越常见）
+KEYWORDS = [
+    '投资', '网购', '客服', '转账', '交友', '银行', '链接', '贷款', '刷单',
+    '兼职', '汇款', '冒充', '验证码', '信用卡', '虚拟货币', '微信', '点击',
+    '下载', '注册', '登录', '密码', '退款', '中奖', '短信', '银行卡',
+    '公检法', '社交软件', '社交媒体', '支付宝', '红包', '个人资料', '身份证',
+    '解冻', '冻结', '安全账户', '比特币', '博彩', '赌博', '退税', '网络购物'
+]
+
+# Zipf 分布权重，模拟少数关键词占大多数案例的情况
+# （extract_keywords 按子串匹配，如抽到「银行卡」也会命中「银行」，与线上行为一致）
+KEYWORD_WEIGHTS = [1.0 / (rank + 1) for rank in range(len(KEYWORDS))]
+
+
+class CountingProxy:
+    """包装 db 客户端，统计每种往返方法的调用次数与失败次数
+
+    save_cases_to_firebase / search_similar_cases 会吞掉例外，
+    因此在这里记录失败，避免失败的运行产生看似正常的数据。
+    """
+
+    def __init__(self, target, counter, errors):
+        self._target = target
+        self._counter = counter
+        self._errors = errors
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            try:
+                if name in ROUND_TRIP_METHODS:
+                    self._counter[name] += 1
+                    result = attr(*args, **kwargs)
+                    # stream 返回生成器，需要在此消费，延迟才计入本次调用
+                    return list(result) if name == 'stream' else result
+                return CountingProxy(attr(*args, **kwargs), self._counter, self._errors)
+            except Exception:
+                self._errors[name] += 1
+                raise
+
+        return wrapper
+
+
+class MemorySnapshot:
+    def __init__(self, data):
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class MemoryDocument:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self):
+        return MemorySnapshot(self._collection.docs.get(self.id))
+
+    def set(self, data):
+        self._collection.put(self.id, dict(data))
+
+    def update(self, data):
+        if self.id not in self._collection.docs:
+            raise KeyError(f"文档不存在: {self.id}")
+        merged = dict(self._collection.docs[self.id])
+        merged.update(data)
+        self._collection.put(self.id, merged)
+
+
+class MemoryQuery:
+    def __init__(self, collection, field, value, limit=None):
+        self._collection = collection
+        self._field = field
+        self._value = value
+        self._limit = limit
+
+    def limit(self, count):
+        return MemoryQuery(self._collection, self._field, self._value, count)
+
+    def stream(self):
+        doc_ids = self._collection.index[self._field].get(self._value, {})
+        for i, doc_id in enumerate(doc_ids):
+            if self._limit is not None and i >= self._limit:
+                break
+            yield MemorySnapshot(self._collection.docs[doc_id])
+
+
+class MemoryCollection:
+    """只实现 scrap_165 用到的接口，array_contains 查询走倒排索引，行为接近 Firestore"""
+
+    def __init__(self):
+        self.docs = {}
+        # 字段 -> 值 -> 有序的文档ID集合（dict 保持插入顺序）
+        self.index = defaultdict(lambda: defaultdict(dict))
+
+    def put(self, doc_id, data):
+        old = self.docs.get(doc_id)
+        if old is not None:
+            for field, values in old.items():
+                if isinstance(values, list):
+                    for value in values:
+                        self.index[field][value].pop(doc_id, None)
+        self.docs[doc_id] = data
+        for field, values in data.items():
+            if isinstance(values, list):
+                for value in values:
+                    self.index[field][value][doc_id] = True
+
+    def document(self, doc_id):
+        return MemoryDocument(self, doc_id)
+
+    def where(self, field, op, value):
+        if op != 'array_contains':
+            raise ValueError(f"内存替身不支持的查询运算符: {op}")
+        return MemoryQuery(self, field, value)
+
+
+class MemoryClient:
+    """Firestore 客户端的内存替身"""
+
+    def __init__(self):
+        self._collections = defaultdict(MemoryCollection)
+
+    def collection(self, name):
+        return self._collections[name]
+
+
+def create_emulator_client(project_id):
+    """连接本地 Firestore 模拟器并清空数据"""
+    import requests
+    from google.cloud import firestore as gcloud_firestore
+
+    emulator_host = os.environ.get('FIRESTORE_EMULATOR_HOST')
+    if not emulator_host:
+        raise RuntimeError("请先设置 FIRESTORE_EMULATOR_HOST，例如 localhost:8080")
+
+    requests.delete(
+        f"http://{emulator_host}/emulator/v1/projects/{project_id}/databases/(default)/documents"
+    ).raise_for_status()
+    return gcloud_firestore.Client(project=project_id)
+
+
+def generate_cases(count, seed=0):
+    """生成带有真实关键词分布的合成案例"""
+    rng = random.Random(seed)
+    start_date = date(2024, 1, 1)
+    cases = []
+    for i in range(count):
+        case_date = start_date + timedelta(days=rng.randrange(365))
+        location = rng.choice(LOCATIONS)
+        method = rng.choice(METHODS)
+        picked = set(rng.choices(KEYWORDS, weights=KEYWORD_WEIGHTS, k=rng.randint(1, 5)))
+        summary = f"案例{i}：民众遭{method}手法诈骗，涉及" + '、'.join(sorted(picked)) + "，损失金额" \
+            f"{rng.randint(1, 500) * 1000}元。"
+        cases.append({
+            'date': f"{case_date.year - 1911}-{case_date.month:02d}-{case_date.day:02d}",
+            'location': location,
+            'method': method,
+            'summary': summary,
+            'keywords': extract_keywords(summary),
+            'timestamp': datetime.now().isoformat()
+        })
+    return cases
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def run_benchmark(db_factory, size, queries, query_limit, seed):
+    """对单一数据量执行写入与查询压测"""
+    counter = Counter()
+    errors = Counter()
+    db = CountingProxy(db_factory(), counter, errors)
+    cases = generate_cases(size, seed)
+
+    start = time.perf_counter()
+    saved = save_cases_to_firebase(db, cases)
+    ingest_seconds = time.perf_counter() - start
+    ingest_calls = dict(counter)
+    ingest_round_trips = sum(ingest_calls.values())
+
+    if not saved or errors:
+        # 写入中途失败时吞吐量与往返次数都不完整，不报告也不继续查询
+        return {
+            'size': size,
+            'error': f"写入失败：{dict(errors) or 'save_cases_to_firebase 返回 False'}",
+            'ingest_calls': ingest_calls,
+        }
+
+    rng = random.Random(seed + 1)
+    latencies = []
+    failed_queries = 0
+    counter.clear()
+    for _ in range(queries):
+        keywords = list(set(rng.choices(KEYWORDS, weights=KEYWORD_WEIGHTS, k=rng.randint(1, 3))))
+        errors_before = sum(errors.values())
+        start = time.perf_counter()
+        search_similar_cases(db, keywords, limit=query_limit)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        # 失败的查询会提前返回 []，不计入延迟分位数
+        if sum(errors.values()) > errors_before:
+            failed_queries += 1
+        else:
+            latencies.append(elapsed_ms)
+    query_round_trips = sum(counter.values())
+
+    def latency_percentile(pct):
+        return round(percentile(latencies, pct), 3) if latencies else None
+
+    return {
+        'size': size,
+        'error': f"{failed_queries} 次查询失败" if failed_queries else None,
+        'ingest_seconds': round(ingest_seconds, 3),
+        'ingest_cases_per_second': round(size / ingest_seconds, 1) if ingest_seconds else None,
+        'ingest_round_trips': ingest_round_trips,
+        'ingest_round_trips_per_case': round(ingest_round_trips / size, 3) if size else 0,
+        'ingest_calls': ingest_calls,
+        'queries': queries,
+        'failed_queries': failed_queries,
+        'query_p50_ms': latency_percentile(50),
+        'query_p90_ms': latency_percentile(90),
+        'query_p99_ms': latency_percentile(99),
+        'query_round_trips_per_query': round(query_round_trips / queries, 3) if queries else 0,
+    }
+
+
+def print_results(results):
+    print("\n" + "=" * 96)
+    print(f"{'案例数':>10} {'写入(案例/秒)':>14} {'往返/案例':>10} {'查询p50(ms)':>12} "
+          f"{'p90(ms)':>10} {'p99(ms)':>10} {'往返/查询':>10}")
+    print("-" * 96)
+    for r in results:
+        if 'ingest_seconds' not in r:
+            print(f"{r['size']:>10} {r['error']}")
+            continue
+        print(f"{r['size']:>10} {r['ingest_cases_per_second'] or 0:>14} {r['ingest_round_trips_per_case']:>10} "
+              f"{str(r['query_p50_ms']):>12} {str(r['query_p90_ms']):>10} {str(r['query_p99_ms']):>10} "
+              f"{r['query_round_trips_per_query']:>10}")
+        if r['error']:
+            print(f"{'':>10} 警告：{r['error']}，延迟分位数只统计成功的查询")
+    print("=" * 96)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="诈骗案例写入与搜索的 Firestore 压测")
+    parser.add_argument('--backend', choices=['memory', 'emulator'], default='memory',
+                        help="memory 为内存替身，emulator 需设置 FIRESTORE_EMULATOR_HOST")
+    parser.add_argument('--sizes', default='10000,100000',
+                        help="以逗号分隔的案例数量，例如 10000,100000,1000000")
+    parser.add_argument('--queries', type=int, default=200, help="每个数据量执行的查询次数")
+    parser.add_argument('--query-limit', type=int, default=5, help="search_similar_cases 的 limit 参数")
+    parser.add_argument('--rate', type=float, default=1e9,
+                        help="Firestore 限流器的初始与最大速率（次/秒），默认不限流以只测存储路径")
+    parser.add_argument('--project', default='demo-linebot', help="模拟器使用的项目ID")
+    parser.add_argument('--seed', type=int, default=42, help="随机种子，保证结果可重现")
+    parser.add_argument('--output', help="将结果保存为 JSON 文件，便于比较不同存储方案")
+    args = parser.parse_args()
+
+    # save_cases_to_firebase 的文档ID依赖 hash(summary)，字符串哈希每个进程不同；
+    # 未固定 PYTHONHASHSEED 时以固定值重新启动，保证同一 --seed 的结果可比较
+    if os.environ.get('PYTHONHASHSEED') is None:
+        os.environ['PYTHONHASHSEED'] = '0'
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    # 首次创建时设定 Firestore 共用限流器的速率，scrap_165 之后取得的都是同一个实例
+    get_limiter(FIRESTORE_HOST, initial_rate=args.rate, max_rate=args.rate, burst=args.rate)
+
+    if args.backend == 'emulator':
+        db_factory = lambda: create_emulator_client(args.project)
+    else:
+        db_factory = MemoryClient
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(',') if s.strip()):
+        print(f"正在压测 {size} 个案例（{args.backend}）...")
+        result = run_benchmark(db_factory, size, args.queries, args.query_limit, args.seed)
+        result['backend'] = args.backend
+        results.append(result)
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'generated_at': datetime.now().isoformat(),
+                'backend': args.backend,
+                'queries': args.queries,
+                'query_limit': args.query_limit,
+                'seed': args.seed,
+                'python_hash_seed': os.environ.get('PYTHONHASHSEED'),
+                'results': results
+            }, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+
+    if any(r['error'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,7 @@ except ImportError:
     subprocess.check_call(["pip3", "install", "pandas"])
     import pandas as pd
 import json
+from rate_limiter import get_limiter
 
 # 設置文件保存路徑為linebot_chatgpt根目錄
 current_dir = os.getcwd()
@@ -50,14 +51,83 @@ chrome_options.add_argument('--no-sandbox')
 chrome_options.add_argument('--window-size=1920,1080')  # 設置窗口大小
 chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')  # 添加user-agent
 
+# 精簡載入模式：只需要案例表格，封鎖圖片、字型、媒體與第三方腳本（設 CRAWLER_LEAN_LOAD=1 開啟）
+LEAN_LOAD = os.environ.get('CRAWLER_LEAN_LOAD', '0') == '1'
+# 額外擷取填充表格的 XHR/JSON 回應（設 CRAWLER_CAPTURE_XHR=1 開啟）
+CAPTURE_XHR = os.environ.get('CRAWLER_CAPTURE_XHR', '0') == '1'
+
+# 透過 CDP 封鎖的資源網址樣式
+BLOCKED_URL_PATTERNS = [
+    # 圖片
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    # 字型
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*fonts.googleapis.com*', '*fonts.gstatic.com*',
+    # 影音
+    '*.mp4', '*.webm', '*.mp3', '*.m3u8',
+    # 第三方分析與廣告腳本
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*connect.facebook.net*', '*hotjar.com*', '*clarity.ms*',
+]
+
+if LEAN_LOAD:
+    # DOMContentLoaded 後即返回，不等待圖片等子資源
+    chrome_options.page_load_strategy = 'eager'
+    chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+    # 禁止影音自動播放；影音檔本身由 BLOCKED_URL_PATTERNS 封鎖
+    chrome_options.add_argument('--autoplay-policy=user-gesture-required')
+    chrome_options.add_experimental_option('prefs', {
+        'profile.managed_default_content_settings.images': 2,
+        'profile.default_content_setting_values.notifications': 2,
+    })
+    print("已啟用精簡載入模式")
+
+if CAPTURE_XHR:
+    # 開啟效能日誌以取得 Network 事件
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+def capture_json_payloads(driver):
+    """從效能日誌中擷取頁面發出的 XHR/Fetch JSON 回應"""
+    payloads = []
+    for entry in driver.get_log('performance'):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        if message.get('method') != 'Network.responseReceived':
+            continue
+        params = message.get('params', {})
+        response = params.get('response', {})
+        if params.get('type') not in ('XHR', 'Fetch') or 'json' not in response.get('mimeType', ''):
+            continue
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': params['requestId']})
+            payloads.append({
+                "url": response.get('url'),
+                "data": json.loads(body.get('body', ''))
+            })
+        except Exception as e:
+            print(f"讀取回應內容失敗: {response.get('url')}, 錯誤: {str(e)}")
+    return payloads
+
+
 try:
     # 使用webdriver_manager自動安裝和配置ChromeDriver
     service = Service(ChromeDriverManager().install())
     driver = webdriver.Chrome(service=service, options=chrome_options)
     
+    if LEAN_LOAD or CAPTURE_XHR:
+        driver.execute_cdp_cmd('Network.enable', {})
+    if LEAN_LOAD:
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+    
     # 訪問網站
     url = "https://165dashboard.tw/city-case-summary"
     print(f"正在訪問: {url}")
+    # Selenium 無法取得狀態碼，整頁載入時間也不代表主機是否限流，
+    # 因此只向該主機共用的限流器取得令牌排隊，不回饋 AIMD 調整
+    get_limiter(url).acquire()
     driver.get(url)
     
     # 輸出頁面標題，確認頁面是否加載
@@ -108,6 +178,14 @@ try:
 
     print(f"完成頁面滾動，共加載約 {records_count} 筆記錄")
     
+    # 擷取填充表格的 JSON 資料
+    if CAPTURE_XHR:
+        payloads = capture_json_payloads(driver)
+        xhr_path = os.path.join(save_dir, "165dashboard_xhr_payload.json")
+        with open(xhr_path, "w", encoding="utf-8") as f:
+            json.dump(payloads, f, ensure_ascii=False, indent=2)
+        print(f"已擷取 {len(payloads)} 筆 XHR/JSON 回應並保存到 {xhr_path}")
+    
     # 保存頁面源碼以供分析
     with open(os.path.join(save_dir, "page_source.html"), "w", encoding="utf-8") as f:
         f.write(driver.page_source)
@@ -5,10 +5,11 @@ import requests
 from bs4 import BeautifulSoup
 import json
 import re
-import time
 import os
 from urllib.parse import urljoin
 
+from rate_limiter import get_limiter
+
 class JHHealthScraper:
     def __init__(self):
         self.base_url = "https://jhhealth.com.tw"
@@ -16,6 +17,7 @@ class JHHealthScraper:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
         self.products = []
+        self.session = requests.Session()
         self.categories = {
             "健康生技館": [
                 "機能強化", 
@@ -38,7 +40,9 @@ class JHHealthScraper:
     def fetch_page(self, url):
         """獲取頁面內容"""
         try:
-            response = requests.get(url, headers=self.headers)
+            # 按網址所屬主機取得共用的自適應限流器，取代固定的 sleep 間隔
+            limiter = get_limiter(url, initial_rate=1.0, max_rate=8.0)
+            response = limiter.get(url, session=self.session, headers=self.headers)
             response.raise_for_status()
             return response.text
         except Exception as e:
@@ -173,7 +177,6 @@ class JHHealthScraper:
                 print(f"正在獲取 {category} - {subcategory} 的產品鏈接...")
                 links = self.extract_product_links_from_category(category, subcategory)
                 all_product_links.update(links)
-                time.sleep(1)  # 休息一下，避免請求過於頻繁
         
         print(f"總共找到 {len(all_product_links)} 個產品鏈接")
         
@@ -183,7 +186,6 @@ class JHHealthScraper:
             product_info = self.extract_product_info(url)
             if product_info:
                 self.products.append(product_info)
-            time.sleep(2)  # 休息一下，避免請求過於頻繁
         
         return self.products
     
@@ -225,7 +227,6 @@ class JHHealthScraper:
             product_info = self.extract_product_info(url)
             if product_info:
                 self.products.append(product_info)
-            time.sleep(2)
         
         return self.products
 
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+按主機共用的自適應限流器
+
+以令牌桶控制每個主機的請求速率，並依照 AIMD（加法增、乘法減）原則調整：
+- 請求成功且延遲低於目標值時，速率小幅加法上調
+- 遇到 429/503、Retry-After、逾時、連線錯誤或延遲過高時，速率按比例下調
+爬蟲與 Firebase 寫入都透過 get_limiter() 取得同一主機的限流器。
+"""
+
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+# 視為「目標主機要求降速」的狀態碼
+THROTTLE_STATUS_CODES = (429, 503)
+
+# Retry-After 超過此秒數時不再等待，直接放棄重試
+DEFAULT_MAX_RETRY_AFTER = 120.0
+
+# 未指定 timeout 時的預設請求逾時（秒），避免主機掛起時無限等待
+DEFAULT_TIMEOUT = 30.0
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 標頭，回傳需等待的秒數（無法解析或非有限值時回傳 None）"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        return max(0.0, seconds) if math.isfinite(seconds) else None
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_throttle_error(exc):
+    """判斷例外是否代表被目標主機限流或暫時不可用（HTTP 429/503）"""
+    response = getattr(exc, 'response', None)
+    if getattr(response, 'status_code', None) in THROTTLE_STATUS_CODES:
+        return True
+    # google.api_core 的 TooManyRequests / ResourceExhausted 帶有 code == 429，ServiceUnavailable 為 503
+    return getattr(exc, 'code', None) in THROTTLE_STATUS_CODES
+
+
+class AdaptiveRateLimiter:
+    """單一主機的令牌桶限流器，速率依 AIMD 原則自動調整"""
+
+    def __init__(self, host, initial_rate=1.0, min_rate=0.2, max_rate=10.0,
+                 burst=1.0, increase_step=0.25, decrease_factor=0.5,
+                 target_latency=2.0, max_retry_after=DEFAULT_MAX_RETRY_AFTER,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.host = host
+        self.rate = float(initial_rate)        # 每秒允許的請求數
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.burst = float(burst)              # 令牌桶容量
+        self.increase_step = float(increase_step)
+        self.decrease_factor = float(decrease_factor)
+        self.target_latency = float(target_latency)
+        self.max_retry_after = float(max_retry_after)
+        self._clock = clock
+        self._sleep = sleep
+
+        self._tokens = self.burst
+        self._last_refill = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """取得一個令牌，必要時阻塞等待"""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+    def record_success(self, latency):
+        """請求成功：延遲正常時加法上調速率，過慢時乘法下調"""
+        with self._lock:
+            if latency > self.target_latency:
+                self._decrease()
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def record_throttle(self, retry_after=None):
+        """被限流：乘法下調速率，並依 Retry-After 暫停此主機的所有請求
+
+        Retry-After 超過 max_retry_after 時不暫停，回傳 False 表示不應再重試。
+        """
+        with self._lock:
+            self._decrease()
+            self._tokens = 0.0
+            if retry_after is not None and retry_after > self.max_retry_after:
+                return False
+            if retry_after:
+                self._blocked_until = max(self._blocked_until,
+                                          self._clock() + retry_after)
+            return True
+
+    def _decrease(self):
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+
+    def call(self, func, *args, max_retries=3, **kwargs):
+        """經限流器執行任意呼叫（如 Firestore 讀寫），遇到限流時自動重試"""
+        for attempt in range(max_retries + 1):
+            self.acquire()
+            start = self._clock()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_throttle_error(e):
+                    raise
+                response = getattr(e, 'response', None)
+                headers = getattr(response, 'headers', None) or {}
+                should_retry = self.record_throttle(parse_retry_after(headers.get('Retry-After')))
+                print(f"{self.host} 要求降速，目前速率 {self.rate:.2f} 次/秒")
+                if not should_retry or attempt == max_retries:
+                    raise
+                continue
+            self.record_success(self._clock() - start)
+            return result
+
+    def get(self, url, session=None, max_retries=3, **kwargs):
+        """經限流器發送 GET 請求，遇到 429/503、逾時或連線錯誤時降速並重試"""
+        sender = session or requests
+        kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+        for attempt in range(max_retries + 1):
+            self.acquire()
+            start = self._clock()
+            try:
+                response = sender.get(url, **kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                self.record_throttle()
+                print(f"{self.host} 請求失敗（{type(e).__name__}），目前速率 {self.rate:.2f} 次/秒")
+                if attempt == max_retries:
+                    raise
+                continue
+            latency = self._clock() - start
+            if response.status_code not in THROTTLE_STATUS_CODES:
+                self.record_success(latency)
+                return response
+            should_retry = self.record_throttle(parse_retry_after(response.headers.get('Retry-After')))
+            print(f"{self.host} 回應 {response.status_code}，目前速率 {self.rate:.2f} 次/秒")
+            if not should_retry or attempt == max_retries:
+                return response
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url_or_host, **kwargs):
+    """取得（或建立）指定主機的共用限流器；kwargs 僅在首次建立時生效"""
+    host = urlparse(url_or_host).netloc or url_or_host
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(host, **kwargs)
+            _limiters[host] = limiter
+        return limiter
@@ -9,13 +9,20 @@ import firebase_admin
 from firebase_admin import credentials
 from firebase_admin import firestore
 from datetime import datetime
-import time
-import random
 from dotenv import load_dotenv
 
+from rate_limiter import get_limiter
+
 # 加载环境变量
 load_dotenv()
 
+# Firestore 所有读写共用的限流器（按主机自适应调整速率）
+FIRESTORE_HOST = 'firestore.googleapis.com'
+
+def get_firestore_limiter():
+    """获取Firestore共用的限流器"""
+    return get_limiter(FIRESTORE_HOST, initial_rate=2.0, max_rate=50.0)
+
 def initialize_firebase():
     """初始化Firebase连接"""
     try:
@@ -47,7 +54,8 @@ def scrape_165_cases():
     }
     
     try:
-        response = requests.get(url, headers=headers)
+        limiter = get_limiter(url, initial_rate=1.0, max_rate=5.0)
+        response = limiter.get(url, headers=headers)
         response.raise_for_status()  # 如果请求返回4xx或5xx状态码，抛出异常
         
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -105,6 +113,7 @@ def save_cases_to_firebase(db, cases):
     try:
         # 获取案例集合引用
         collection_ref = db.collection('fraud_cases')
+        limiter = get_firestore_limiter()
         
         # 计数器，记录新增和更新的案例数
         new_count = 0
@@ -116,19 +125,16 @@ def save_cases_to_firebase(db, cases):
             
             # 检查文档是否已存在
             doc_ref = collection_ref.document(doc_id)
-            doc = doc_ref.get()
+            doc = limiter.call(doc_ref.get)
             
             if not doc.exists:
                 # 如果文档不存在，创建新文档
-                doc_ref.set(case)
+                limiter.call(doc_ref.set, case)
                 new_count += 1
             else:
                 # 如果已存在，更新文档
-                doc_ref.update(case)
+                limiter.call(doc_ref.update, case)
                 updated_count += 1
-                
-            # 添加随机延迟，避免请求过于频繁
-            time.sleep(random.uniform(0.5, 1.5))
         
         print(f"成功添加 {new_count} 个新案例，更新 {updated_count} 个现有案例")
         return True
@@ -144,12 +150,13 @@ def search_similar_cases(db, query_keywords, limit=5):
     try:
         results = []
         collection_ref = db.collection('fraud_cases')
+        limiter = get_firestore_limiter()
         
         # 遍历每个关键词进行查询
         for keyword in query_keywords:
             # 查询关键词列表中包含特定关键词的文档
             query = collection_ref.where('keywords', 'array_contains', keyword).limit(limit)
-            docs = query.stream()
+            docs = limiter.call(lambda: list(query.stream()))
             
             # 将结果添加到列表中
             for doc in docs:
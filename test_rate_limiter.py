@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+from rate_limiter import AdaptiveRateLimiter, get_limiter, is_throttle_error, parse_retry_after
+
+
+class FakeClock:
+    """可控的時鐘，sleep 只推進時間不真正等待"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """依序回傳預設的回應"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        self.last_kwargs = kwargs
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class ThrottleError(Exception):
+    def __init__(self, code, headers=None):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+        self.response = FakeResponse(code, headers)
+
+
+def make_limiter(clock, **kwargs):
+    kwargs.setdefault('initial_rate', 2.0)
+    return AdaptiveRateLimiter('example.com', clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(' 1.5 ') == 1.5
+    assert parse_retry_after('-5') == 0.0
+
+
+def test_parse_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    seconds = parse_retry_after(format_datetime(retry_at, usegmt=True))
+    assert 25 <= seconds <= 30
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+
+@pytest.mark.parametrize('value', [None, '', 'soon', 'inf', '-inf', 'nan', 'Infinity'])
+def test_parse_retry_after_rejects_invalid(value):
+    assert parse_retry_after(value) is None
+
+
+def test_is_throttle_error():
+    assert is_throttle_error(ThrottleError(429))
+    assert is_throttle_error(ThrottleError(503))
+    assert not is_throttle_error(ThrottleError(500))
+    assert not is_throttle_error(ValueError("boom"))
+
+
+def test_token_bucket_refill():
+    clock = FakeClock()
+    limiter = make_limiter(clock, initial_rate=2.0, burst=1.0)
+    limiter.acquire()
+    assert clock.sleeps == []
+    limiter.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_aimd_increase_and_decrease():
+    clock = FakeClock()
+    limiter = make_limiter(clock, initial_rate=2.0, max_rate=2.5, increase_step=0.25,
+                           decrease_factor=0.5, min_rate=0.5, target_latency=1.0)
+    limiter.record_success(0.1)
+    assert limiter.rate == pytest.approx(2.25)
+    limiter.record_success(0.1)
+    limiter.record_success(0.1)
+    assert limiter.rate == pytest.approx(2.5)
+    limiter.record_success(5.0)
+    assert limiter.rate == pytest.approx(1.25)
+    limiter.record_throttle()
+    limiter.record_throttle()
+    assert limiter.rate == pytest.approx(0.5)
+
+
+def test_retry_after_blocks_host():
+    clock = FakeClock()
+    limiter = make_limiter(clock, initial_rate=100.0)
+    assert limiter.record_throttle(10.0) is True
+    limiter.acquire()
+    assert clock.now >= 10.0
+
+
+def test_retry_after_above_cap_does_not_block():
+    clock = FakeClock()
+    limiter = make_limiter(clock, max_retry_after=60.0)
+    assert limiter.record_throttle(86400.0) is False
+    limiter.acquire()
+    assert clock.now < 60.0
+
+
+def test_get_retries_then_succeeds():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    session = FakeSession([FakeResponse(429, {'Retry-After': '2'}), FakeResponse(200)])
+    response = limiter.get('https://example.com/', session=session)
+    assert response.status_code == 200
+    assert session.calls == 2
+    assert clock.now >= 2.0
+
+
+def test_get_backs_off_on_connection_errors():
+    clock = FakeClock()
+    limiter = make_limiter(clock, initial_rate=4.0, decrease_factor=0.5)
+    session = FakeSession([requests.exceptions.Timeout(), requests.exceptions.ConnectionError(),
+                           FakeResponse(200)])
+    response = limiter.get('https://example.com/', session=session)
+    assert response.status_code == 200
+    assert session.calls == 3
+    assert session.last_kwargs['timeout'] > 0
+    assert limiter.rate < 4.0
+
+
+def test_get_reraises_connection_error_when_retries_exhausted():
+    clock = FakeClock()
+    limiter = make_limiter(clock, initial_rate=4.0)
+    session = FakeSession([requests.exceptions.ConnectionError()] * 2)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        limiter.get('https://example.com/', session=session, max_retries=1)
+    assert session.calls == 2
+    assert limiter.rate == pytest.approx(1.0)
+
+
+def test_get_returns_last_response_when_retries_exhausted():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    session = FakeSession([FakeResponse(503)] * 3)
+    response = limiter.get('https://example.com/', session=session, max_retries=2)
+    assert response.status_code == 503
+    assert session.calls == 3
+
+
+def test_get_gives_up_on_excessive_retry_after():
+    clock = FakeClock()
+    limiter = make_limiter(clock, max_retry_after=60.0)
+    session = FakeSession([FakeResponse(429, {'Retry-After': '86400'}), FakeResponse(200)])
+    response = limiter.get('https://example.com/', session=session)
+    assert response.status_code == 429
+    assert session.calls == 1
+    assert clock.now < 60.0
+
+
+def test_get_ignores_infinite_retry_after():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    session = FakeSession([FakeResponse(429, {'Retry-After': 'inf'}), FakeResponse(200)])
+    response = limiter.get('https://example.com/', session=session)
+    assert response.status_code == 200
+
+
+def test_call_retries_throttle_errors():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    errors = [ThrottleError(503)]
+
+    def flaky():
+        if errors:
+            raise errors.pop()
+        return 'ok'
+
+    assert limiter.call(flaky) == 'ok'
+
+
+def test_call_raises_when_retries_exhausted():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    attempts = []
+
+    def always_throttled():
+        attempts.append(1)
+        raise ThrottleError(429)
+
+    with pytest.raises(ThrottleError):
+        limiter.call(always_throttled, max_retries=2)
+    assert len(attempts) == 3
+
+
+def test_call_does_not_retry_other_errors():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    attempts = []
+
+    def broken():
+        attempts.append(1)
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        limiter.call(broken)
+    assert len(attempts) == 1
+
+
+def test_get_limiter_is_shared_per_host():
+    first = get_limiter('https://shared.example.com/a')
+    assert get_limiter('https://shared.example.com/b') is first
+    assert get_limiter('shared.example.com') is first
+    assert get_limiter('https://other.example.com/') is not first